@@ -1,6 +1,7 @@
 from .cli import app
 from .main import (
     check_version_consistency,
+    clear_cache,
     detect_codebase_layout,
     get_addons_path,
     get_odoo_version,
@@ -11,6 +12,7 @@ from .main import (
 __all__ = [
     "app",
     "check_version_consistency",
+    "clear_cache",
     "detect_codebase_layout",
     "get_addons_path",
     "get_odoo_version",
@@ -1,4 +1,5 @@
 import glob
+import re
 from pathlib import Path
 from typing import Annotated
 
@@ -6,6 +7,8 @@ import typer
 
 from .main import check_version_consistency, detect_codebase_layout, get_addons_path
 
+_GLOB_META = re.compile(r"[*?\[]")
+
 
 def _parse_paths(values: list[str] | None) -> list[Path]:
     if not values:
@@ -16,11 +19,11 @@ def _parse_paths(values: list[str] | None) -> list[Path]:
             p_str = p_str.strip()
             if not p_str:
                 continue
-            p = Path(p_str).expanduser()
-            if "*" in str(p) or "?" in str(p) or "[" in str(p):
-                paths.extend(Path(g) for g in sorted(glob.glob(str(p), recursive=True)))
+            p_str = str(Path(p_str).expanduser())
+            if _GLOB_META.search(p_str):
+                paths.extend(Path(g) for g in sorted(glob.iglob(p_str, recursive=True)))
             else:
-                paths.append(p)
+                paths.append(Path(p_str))
     return paths
 
 
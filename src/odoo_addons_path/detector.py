@@ -1,46 +1,124 @@
-from abc import ABC, abstractmethod
+import os
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any
 
 import yaml
 
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-class CodeBaseDetector(ABC):
-    _next_detector: Optional["CodeBaseDetector"] = None
+# Odoo core addons, relative to the folder holding the Odoo checkout in ``odoo/``
+_ODOO_CORE_ADDONS = (os.path.join("odoo", "addons"), os.path.join("odoo", "odoo", "addons"))
+# Camptocamp legacy layout keeps the Odoo checkout in ``odoo/src/``
+_C2C_LEGACY_CORE_ADDONS = (os.path.join("src", "addons"), os.path.join("src", "odoo", "addons"))
+_DOODBA_SRC = os.path.join("odoo", "custom", "src")
+# VCS metadata, virtualenvs and tool caches never hold Odoo modules
+_PRUNED_DIRS = frozenset({
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    ".venv",
+    "node_modules",
+    ".mypy_cache",
+    ".ruff_cache",
+    ".pytest_cache",
+})
+_ODOO_SH_MARKERS = frozenset({"enterprise", "odoo", "themes", "user"})
+# Name reported by detect_generic
+FALLBACK_LAYOUT = "fallback"
 
-    def set_next(self, detector: "CodeBaseDetector") -> "CodeBaseDetector":
-        self._next_detector = detector
-        return detector
+# Parsed file contents keyed by path, invalidated on (mtime_ns, size) change
+_CACHE_MAX_SIZE = 100
+_YAML_CACHE: OrderedDict[str, tuple[int, int, Any]] = OrderedDict()
+_DOCKERFILE_CACHE: OrderedDict[str, tuple[int, int, Any]] = OrderedDict()
 
-    @abstractmethod
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        if self._next_detector:
-            return self._next_detector.detect(codebase)
-        return None
 
+def _load_cached(
+    cache: OrderedDict[str, tuple[int, int, Any]], path: str | Path, load: Callable[[str | Path], Any]
+) -> Any:
+    st = os.stat(path)
+    key = os.fspath(path)
+    cached = cache.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        cache.move_to_end(key)
+        return cached[2]
+    value = load(path)
+    cache[key] = (st.st_mtime_ns, st.st_size, value)
+    cache.move_to_end(key)
+    if len(cache) > _CACHE_MAX_SIZE:
+        cache.popitem(last=False)
+    return value
 
-class TrobzDetector(CodeBaseDetector):
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        if (codebase / ".trobz").is_dir():
-            addons_dirs = []
-            for item in (codebase / "addons").iterdir():
-                if item.is_dir():
-                    addons_dirs.append(item)
-            return (
-                "Trobz",
-                {
-                    "addons_dirs": addons_dirs,
-                    "addons_dir": [codebase / "project"],
-                    "odoo_dir": [
-                        codebase / "odoo/addons",
-                        codebase / "odoo/odoo/addons",
-                    ],
-                },
-            )
-        return super().detect(codebase)
+
+def _load_yaml(path: str | Path) -> Any:
+    with open(path) as f:
+        return yaml.load(f, Loader=_YAML_LOADER)  # noqa: S506
+
+
+def _load_yaml_cached(path: str | Path) -> Any:
+    return _load_cached(_YAML_CACHE, path, _load_yaml)
+
+
+def _read_head(path: str | Path, size: int = 8192) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+def _read_head_cached(path: str | Path) -> bytes:
+    return _load_cached(_DOCKERFILE_CACHE, path, _read_head)
+
+
+def clear_cache() -> None:
+    """Drop the parsed ``.copier-answers.yml`` and Dockerfile contents."""
+    _YAML_CACHE.clear()
+    _DOCKERFILE_CACHE.clear()
+
+
+def _dirs_in(path: str | Path, exclude: tuple[str, ...] = ()) -> list[Path]:
+    """List the sub-directories of *path* in name order, relying on ``os.scandir`` cached entry types.
+
+    A missing or unreadable *path* yields an empty list.
+    """
+    try:
+        with os.scandir(path) as it:
+            subdirs = sorted(e.path for e in it if e.name not in exclude and e.is_dir())
+    except OSError:
+        return []
+    return [Path(p) for p in subdirs]
 
 
-class DoodbaDetector(CodeBaseDetector):
+def _scan_top(codebase: str | Path) -> dict[str, os.DirEntry]:
+    """Map the names found at the root of *codebase* to their directory entries."""
+    try:
+        with os.scandir(codebase) as it:
+            return {e.name: e for e in it}
+    except OSError:
+        return {}
+
+
+DetectionResult = tuple[str, dict[str, Any]]
+Detector = Callable[[Path, dict[str, os.DirEntry] | None], DetectionResult | None]
+
+
+def detect_trobz(codebase: Path, top: dict[str, os.DirEntry] | None = None) -> DetectionResult | None:
+    if top is None:
+        top = _scan_top(codebase)
+    if ".trobz" not in top or not top[".trobz"].is_dir():
+        return None
+    base = os.fspath(codebase)
+    return (
+        "Trobz",
+        {
+            "addons_dirs": _dirs_in(os.path.join(base, "addons")),
+            "addons_dir": [Path(os.path.join(base, "project"))],
+            "odoo_dir": [Path(os.path.join(base, p)) for p in _ODOO_CORE_ADDONS],
+        },
+    )
+
+
+def detect_doodba(codebase: Path, top: dict[str, os.DirEntry] | None = None) -> DetectionResult | None:
     """
     ┌─ root/
     │  └── odoo/
@@ -53,38 +131,81 @@ class DoodbaDetector(CodeBaseDetector):
     │              └── submodule/
     │                  └── addon1/
     """
-
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        copier_answers_file = codebase / ".copier-answers.yml"
-        if not copier_answers_file.is_file():
-            return super().detect(codebase)
-        with open(copier_answers_file) as f:
-            try:
-                answers = yaml.safe_load(f)
-                if "doodba" in answers.get("_src_path", ""):
-                    addons_dirs = []
-                    path = codebase / "odoo" / "custom" / "src"
-                    if path.is_dir():
-                        for item in path.iterdir():
-                            if item.is_dir() and item.name not in ("odoo", "private"):
-                                addons_dirs.append(item)
-                        return (
-                            "Doodba",
-                            {
-                                "addons_dirs": addons_dirs,
-                                "addons_dir": [codebase / "odoo/custom/src/private"],
-                                "odoo_dir": [
-                                    codebase / "odoo/custom/src/odoo/addons",
-                                    codebase / "odoo/custom/src/odoo/odoo/addons",
-                                ],
-                            },
-                        )
-            except yaml.YAMLError:
-                pass
-        return super().detect(codebase)
-
-
-class C2CDetector(CodeBaseDetector):
+    if top is None:
+        top = _scan_top(codebase)
+    if ".copier-answers.yml" not in top or not top[".copier-answers.yml"].is_file():
+        return None
+    try:
+        answers = _load_yaml_cached(top[".copier-answers.yml"].path) or {}
+    except yaml.YAMLError:
+        return None
+    if "doodba" not in answers.get("_src_path", ""):
+        return None
+    src = os.path.join(codebase, _DOODBA_SRC)
+    if not os.path.isdir(src):
+        return None
+    return (
+        "Doodba",
+        {
+            "addons_dirs": _dirs_in(src, exclude=("odoo", "private")),
+            "addons_dir": [Path(os.path.join(src, "private"))],
+            "odoo_dir": [Path(os.path.join(src, p)) for p in _ODOO_CORE_ADDONS],
+        },
+    )
+
+
+def _c2c_find_docker_file(top: dict[str, os.DirEntry]) -> str | None:
+    if "odoo" in top and top["odoo"].is_dir():
+        path = os.path.join(top["odoo"].path, "Dockerfile")
+        if os.path.isfile(path):
+            return path
+    if "Dockerfile" in top and top["Dockerfile"].is_file():
+        return top["Dockerfile"].path
+    return None
+
+
+def _is_c2c_dockerfile(docker_file: str) -> bool:
+    try:
+        # the maintainer LABEL sits near the top of the Dockerfile
+        data = _read_head_cached(docker_file)
+    except (FileNotFoundError, PermissionError, OSError):
+        return False
+    return b"Camptocamp" in data and (
+        b"LABEL maintainer='Camptocamp'" in data or b'LABEL maintainer="Camptocamp"' in data
+    )
+
+
+def _c2c_legacy_config(codebase: Path, addons_dirs: list[Path]) -> dict[str, Any]:
+    odoo_root = os.path.join(codebase, "odoo")
+    return {
+        "addons_dirs": addons_dirs,
+        "addons_dir": [Path(os.path.join(odoo_root, "local-src"))],
+        "odoo_dir": [Path(os.path.join(odoo_root, p)) for p in _C2C_LEGACY_CORE_ADDONS],
+    }
+
+
+def _c2c_new_config(codebase: Path, addons_dirs: list[Path]) -> dict[str, Any]:
+    addons_dir_paths = []
+    odoo_dir_paths = []
+    odoo_root = os.path.join(codebase, "odoo")
+
+    for dir_name in ["dev-src", "paid-modules"]:
+        dir_path = os.path.join(odoo_root, dir_name)
+        if os.path.isdir(dir_path):
+            addons_dir_paths.append(Path(dir_path))
+
+    odoo_addons_dir = os.path.join(odoo_root, "addons")
+    if os.path.isdir(odoo_addons_dir):
+        odoo_dir_paths.append(Path(odoo_addons_dir))
+
+    return {
+        "addons_dirs": addons_dirs,
+        "addons_dir": addons_dir_paths,
+        "odoo_dir": odoo_dir_paths,
+    }
+
+
+def detect_c2c(codebase: Path, top: dict[str, os.DirEntry] | None = None) -> DetectionResult | None:
     """
     Supports both legacy and new C2C project structures:
 
@@ -114,77 +235,20 @@ class C2CDetector(CodeBaseDetector):
     │       ├── custom-repo/
     │       └── addon4/
     """
-
-    def _find_docker_file(self, codebase: Path) -> Path | None:
-        for path in [codebase / "odoo" / "Dockerfile", codebase / "Dockerfile"]:
-            if path.is_file():
-                return path
+    if top is None:
+        top = _scan_top(codebase)
+    docker_file = _c2c_find_docker_file(top)
+    if not docker_file or not _is_c2c_dockerfile(docker_file):
         return None
 
-    def _is_c2c_dockerfile(self, docker_file: Path) -> bool:
-        try:
-            with open(docker_file) as f:
-                content = f.read()
-                return "LABEL maintainer='Camptocamp'" in content or 'LABEL maintainer="Camptocamp"' in content
-        except (FileNotFoundError, PermissionError, OSError):
-            return False
-
-    def _collect_external_src_dirs(self, codebase: Path) -> list[Path]:
-        addons_dirs = []
-        external_src_dir = codebase / "odoo" / "external-src"
-        if external_src_dir.is_dir():
-            for item in external_src_dir.iterdir():
-                if item.is_dir():
-                    addons_dirs.append(item)
-        return addons_dirs
-
-    def _detect_legacy_layout(self, codebase: Path) -> bool:
-        odoo_src_dir = codebase / "odoo" / "src"
-        return odoo_src_dir.is_dir()
-
-    def _get_legacy_config(self, codebase: Path, addons_dirs: list[Path]) -> dict[str, Any]:
-        return {
-            "addons_dirs": addons_dirs,
-            "addons_dir": [codebase / "odoo/local-src"],
-            "odoo_dir": [
-                codebase / "odoo/src/addons",
-                codebase / "odoo/src/odoo/addons",
-            ],
-        }
-
-    def _get_new_config(self, codebase: Path, addons_dirs: list[Path]) -> dict[str, Any]:
-        addons_dir_paths = []
-        odoo_dir_paths = []
-
-        for dir_name in ["dev-src", "paid-modules"]:
-            dir_path = codebase / "odoo" / dir_name
-            if dir_path.is_dir():
-                addons_dir_paths.append(dir_path)
-
-        odoo_addons_dir = codebase / "odoo" / "addons"
-        if odoo_addons_dir.is_dir():
-            odoo_dir_paths.append(odoo_addons_dir)
+    addons_dirs = _dirs_in(os.path.join(codebase, "odoo", "external-src"))
 
-        return {
-            "addons_dirs": addons_dirs,
-            "addons_dir": addons_dir_paths,
-            "odoo_dir": odoo_dir_paths,
-        }
+    if os.path.isdir(os.path.join(codebase, "odoo", "src")):
+        return "Camptocamp (Legacy)", _c2c_legacy_config(codebase, addons_dirs)
+    return "Camptocamp", _c2c_new_config(codebase, addons_dirs)
 
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        docker_file = self._find_docker_file(codebase)
-        if not docker_file or not self._is_c2c_dockerfile(docker_file):
-            return super().detect(codebase)
 
-        addons_dirs = self._collect_external_src_dirs(codebase)
-
-        if self._detect_legacy_layout(codebase):
-            return "Camptocamp (Legacy)", self._get_legacy_config(codebase, addons_dirs)
-        else:
-            return "Camptocamp", self._get_new_config(codebase, addons_dirs)
-
-
-class OdooShDetector(CodeBaseDetector):
+def detect_odoo_sh(codebase: Path, top: dict[str, os.DirEntry] | None = None) -> DetectionResult | None:
     """
     Follow Odoo.sh mode
     src/
@@ -194,53 +258,137 @@ class OdooShDetector(CodeBaseDetector):
     ├── user/               # user's submodule
     │   └── OCA/
     """
+    if top is None:
+        top = _scan_top(codebase)
+    if not all(name in top and top[name].is_dir() for name in _ODOO_SH_MARKERS):
+        return None
+    base = os.fspath(codebase)
+    return (
+        "odoo.sh",
+        {
+            "addons_dirs": [
+                Path(os.path.join(base, "enterprise")),
+                Path(os.path.join(base, "themes")),
+                *_dirs_in(os.path.join(base, "user")),
+            ],
+            "addons_dir": [Path(os.path.join(base, "project"))],
+            "odoo_dir": [Path(os.path.join(base, p)) for p in _ODOO_CORE_ADDONS],
+        },
+    )
+
+
+# OCA repositories keep symlinked copies of their modules under ``setup/``
+_MODULE_PRUNED_DIRS = _PRUNED_DIRS | {"setup"}
+
 
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        if (
-            (codebase / "enterprise").is_dir()
-            and (codebase / "odoo").is_dir()
-            and (codebase / "themes").is_dir()
-            and (codebase / "user").is_dir()
-        ):
-            addons_dirs = [codebase / "enterprise", codebase / "themes"]
-            for item in (codebase / "user").iterdir():
-                if item.is_dir():
-                    addons_dirs.append(item)
-            return (
-                "odoo.sh",
-                {
-                    "addons_dirs": addons_dirs,
-                    "addons_dir": [codebase / "project"],
-                    "odoo_dir": [
-                        codebase / "odoo/addons",
-                        codebase / "odoo/odoo/addons",
-                    ],
-                },
+def iter_module_dirs(root: str | Path, max_depth: int | None = None) -> Iterator[str]:
+    """Yield the Odoo module directories found below *root*, without descending into modules.
+
+    Hidden folders, ``setup/`` and ``_PRUNED_DIRS`` are skipped, and so are
+    symlinks below *root*: module symlink farms would otherwise list every
+    module twice. *max_depth* bounds how many levels below *root* are
+    searched (default: no limit).
+    """
+    try:
+        with os.scandir(root) as it:
+            children = sorted(
+                entry.path
+                for entry in it
+                if entry.name not in _MODULE_PRUNED_DIRS
+                and not entry.name.startswith(".")
+                and entry.is_dir(follow_symlinks=False)
             )
-        return super().detect(codebase)
+    except OSError:
+        return
+    for child in children:
+        if os.path.isfile(os.path.join(child, "__manifest__.py")):
+            yield child
+        elif max_depth is None or max_depth > 1:
+            yield from iter_module_dirs(child, None if max_depth is None else max_depth - 1)
+
+
+def _find_addons_dirs(codebase: Path) -> set[str]:
+    if os.path.isfile(os.path.join(codebase, "__manifest__.py")):
+        return {os.path.dirname(os.fspath(codebase))}
+    return {os.path.dirname(module_dir) for module_dir in iter_module_dirs(codebase)}
 
 
-class GenericDetector(CodeBaseDetector):
+def detect_generic(codebase: Path, top: dict[str, os.DirEntry] | None = None) -> DetectionResult | None:
     """
     A fallback detector that looks for any folder that contains __manifest__.py
     """
+    addons_dirs = _find_addons_dirs(codebase)
+    if not addons_dirs:
+        return None
+    return FALLBACK_LAYOUT, {"addons_dirs": [Path(p) for p in sorted(addons_dirs)]}
+
+
+# Detectors in priority order; the first one returning a result wins
+DETECTORS: list[Detector] = [detect_trobz, detect_c2c, detect_odoo_sh, detect_doodba, detect_generic]
 
-    def detect(self, codebase: Path) -> tuple[str, dict[str, Any]] | None:
-        manifest_files = []
-        for manifest_file in codebase.glob("**/__manifest__.py"):
-            # ignore setup folder in a module
-            if "setup" in manifest_file.parts:
-                continue
-            # ignore folder in a same folder
-            str_manifest_file = str(manifest_file)
-            if str_manifest_file.count("__manifest__.py") > 1:
-                continue
-            manifest_files.append(str_manifest_file)
-        if not manifest_files:
-            return super().detect(codebase)
-
-        addons_dirs = set()
-        for manifest_file in manifest_files:
-            addons_dirs.add(Path(manifest_file).parent.parent)
-
-        return "fallback", {"addons_dirs": list(addons_dirs)}
+# Cheap checks against the codebase root listing telling whether a detector may match.
+# Detectors without an entry (the generic fallback) are always tried.
+_LAYOUT_SIGNATURES: dict[Detector, Callable[[dict[str, os.DirEntry]], bool]] = {
+    detect_trobz: lambda top: ".trobz" in top and top[".trobz"].is_dir(),
+    # odoo/Dockerfile itself is probed by detect_c2c
+    detect_c2c: lambda top: "Dockerfile" in top or "odoo" in top,
+    detect_odoo_sh: lambda top: top.keys() >= _ODOO_SH_MARKERS,
+    detect_doodba: lambda top: ".copier-answers.yml" in top,
+}
+
+
+def _pick_detectors(entries: dict[str, os.DirEntry]) -> Iterator[Detector]:
+    """Yield the detectors whose layout markers appear in the codebase root *entries*.
+
+    The root listing from ``_scan_top`` decides which detectors are worth
+    running, in ``DETECTORS`` priority order. Signatures are evaluated
+    lazily, so nothing past the first matching detector is probed.
+    """
+    for detect in DETECTORS:
+        signature = _LAYOUT_SIGNATURES.get(detect)
+        if signature is None or signature(entries):
+            yield detect
+
+
+def detect_layout(codebase: Path) -> DetectionResult | None:
+    """Run the candidate detectors on *codebase* and return the first result."""
+    top = _scan_top(codebase)
+    for detect in _pick_detectors(top):
+        res = detect(codebase, top)
+        if res:
+            return res
+    return None
+
+
+# Root entries read by the detectors: layout markers and the folders whose listing
+# becomes part of the detected paths. Adding or removing a repository in one of them
+# bumps its mtime.
+_WATCHED_ENTRIES = (".trobz", ".copier-answers.yml", "Dockerfile", "addons", "odoo", "user")
+# Same, for entries below ``odoo/``
+_WATCHED_ODOO_ENTRIES = ("Dockerfile", "external-src", os.path.join("custom", "src"))
+
+
+def _mtime_ns(path: str | Path | os.DirEntry) -> int:
+    try:
+        # DirEntry.stat() caches its result on the entry
+        st = path.stat() if isinstance(path, os.DirEntry) else os.stat(path)
+    except OSError:
+        return 0
+    return st.st_mtime_ns
+
+
+def layout_signature(codebase: Path, *extra: str | Path) -> tuple[int, ...]:
+    """Return the mtimes of the entries layout detection reads, then of each *extra* path.
+
+    The tuple changes whenever a detector could return something different,
+    which makes it usable as a cache key. Missing entries count as 0.
+    """
+    # Only entries present in the root listing are stat'ed, through their DirEntry
+    top = _scan_top(codebase)
+    sig = [_mtime_ns(codebase)]
+    for name in _WATCHED_ENTRIES:
+        sig.append(_mtime_ns(top[name]) if name in top else 0)
+    for name in _WATCHED_ODOO_ENTRIES:
+        sig.append(_mtime_ns(os.path.join(top["odoo"].path, name)) if "odoo" in top else 0)
+    sig.extend(_mtime_ns(p) for p in extra)
+    return tuple(sig)
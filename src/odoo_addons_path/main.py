@@ -1,64 +1,127 @@
 import ast
+import functools
+import os
 import re
-from collections import Counter
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
 from pathlib import Path
 
 import typer
 
-from odoo_addons_path.detector import C2CDetector, DoodbaDetector, GenericDetector, OdooShDetector, TrobzDetector
+from odoo_addons_path.detector import (
+    FALLBACK_LAYOUT,
+    DetectionResult,
+    detect_layout,
+    iter_module_dirs,
+    layout_signature,
+)
+from odoo_addons_path.detector import clear_cache as _clear_detector_cache
 
 
-def _add_to_path(path_list: list[str], dirs_to_add: list[Path], is_sorted: bool = False):
+def _add_to_path(path_list: dict[str, None], dirs_to_add: Sequence[str | Path], is_sorted: bool = False):
+    # path_list is an insertion-ordered set: dict keys keep order and dedup in O(1)
     if is_sorted:
-        dirs_to_add = sorted(dirs_to_add, key=lambda p: p.name)
+        dirs_to_add = sorted(dirs_to_add, key=os.path.basename)
     for d in dirs_to_add:
-        if d.is_dir():
-            resolved_path = str(d.resolve())
-            if resolved_path not in path_list:
-                path_list.append(resolved_path)
-
-
-def detect_codebase_layout(codebase: Path, verbose: bool = False) -> dict:
-    trobz = TrobzDetector()
-    c2c = C2CDetector()
-    odoo_sh = OdooShDetector()
-    doodba = DoodbaDetector()
-    fallback = GenericDetector()
-    trobz.set_next(c2c).set_next(odoo_sh).set_next(doodba).set_next(fallback)
-    res = trobz.detect(codebase)
+        if os.path.isdir(d):
+            # canonical paths, so a folder reached through a symlink is listed once
+            path_list.setdefault(os.path.realpath(d), None)
+
+
+# Detections keyed by codebase, kept with the layout signature they were made under
+_LAYOUT_CACHE_MAX_SIZE = 32
+_LAYOUT_CACHE: OrderedDict[str, tuple[tuple[int, ...], DetectionResult]] = OrderedDict()
+
+
+def _detect_layout_cached(codebase: Path) -> DetectionResult | None:
+    key = str(codebase)
+    sig = layout_signature(codebase)
+    cached = _LAYOUT_CACHE.get(key)
+    if cached and cached[0] == sig:
+        _LAYOUT_CACHE.move_to_end(key)
+        return cached[1]
+    res = detect_layout(codebase)
+    # the fallback walks the whole tree, which the signature does not cover,
+    # and a failed detection must be retried on the next call
+    if not res or res[0] == FALLBACK_LAYOUT:
+        _LAYOUT_CACHE.pop(key, None)
+        return res
+    _LAYOUT_CACHE[key] = (sig, res)
+    _LAYOUT_CACHE.move_to_end(key)
+    if len(_LAYOUT_CACHE) > _LAYOUT_CACHE_MAX_SIZE:
+        _LAYOUT_CACHE.popitem(last=False)
+    return res
+
+
+def detect_codebase_layout(codebase: Path, verbose: bool = False, cache: bool = False) -> dict:
+    """Detect the layout of *codebase* and return its categorized paths.
+
+    With *cache*, detections are kept until a layout marker or a folder
+    listed by the layout changes; fallback detections are never cached.
+    Call ``clear_cache()`` to force a new detection.
+    """
+    # resolve symlinks once so every detected path is already canonical
+    codebase = codebase.resolve()
+    res = _detect_layout_cached(codebase) if cache else detect_layout(codebase)
     if not res:
         typer.secho("No codebase layout detected", fg=typer.colors.RED)
         raise typer.Exit(1)
     detector_name, detected_paths = res
     if verbose:
         typer.echo(f"Codebase layout: {detector_name}")
-    return detected_paths
+    # copy so callers cannot alter the cached result
+    return {key: list(paths) for key, paths in detected_paths.items()}
+
+
+_VERSION_INFO_RE = re.compile(rb"version_info\s*=\s*\((\d+),\s*(\d+)")
+_VERSION_INFO_TUPLE_RE = re.compile(rb"version_info\s*=\s*\(([^)]*)\)")
+# Only accept full Odoo format: major.minor.patch.patch.patch (e.g. "18.0.1.0.0")
+_MANIFEST_VERSION_RE = re.compile(r"(\d+\.\d+)\.\d+\.\d+\.\d+$")
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_release(release_py: str, mtime_ns: int, size: int) -> str | None:
+    # mtime_ns and size are only part of the cache key, so edits invalidate it
+    # version_info is declared within the first lines of release.py
+    with open(release_py, "rb") as f:
+        head = f.read(4096)
+    match = _VERSION_INFO_RE.search(head)
+    if match:
+        return f"{int(match.group(1))}.{int(match.group(2))}"
+    # e.g. ('saas~17', 1, 0, FINAL, 0, ''): later fields may be names, so only
+    # the major and minor are evaluated
+    match = _VERSION_INFO_TUPLE_RE.search(head)
+    if not match:
+        return None
+    try:
+        major, minor = (ast.literal_eval(field.strip()) for field in match.group(1).decode().split(",")[:2])
+    except (ValueError, SyntaxError, UnicodeDecodeError):
+        return None
+    return f"{major}.{minor}"
 
 
-def get_odoo_version_from_release(odoo_dir: Path) -> str | None:
+def get_odoo_version_from_release(odoo_dir: str | Path) -> str | None:
     """Read the Odoo version (e.g. '18.0') from ``odoo/release.py``."""
-    release_py = odoo_dir / "odoo" / "release.py"
-    if not release_py.is_file():
+    release_py = os.path.abspath(os.path.join(odoo_dir, "odoo", "release.py"))
+    # get_odoo_version probes every ancestor of the odoo dirs, so most calls miss
+    if not os.path.isfile(release_py):
         return None
-    content = release_py.read_text()
-    match = re.search(r"version_info\s*=\s*\((\d+),\s*(\d+)", content)
-    if match:
-        return f"{match.group(1)}.{match.group(2)}"
-    return None
+    st = os.stat(release_py)
+    return _parse_release(release_py, st.st_mtime_ns, st.st_size)
 
 
-def _extract_version_from_manifest(manifest_path: Path) -> str | None:
+def _extract_version_from_manifest(manifest_path: str | Path) -> str | None:
     """Extract the major version (e.g. '18.0') from a ``__manifest__.py`` file."""
     try:
-        content = manifest_path.read_text()
+        with open(manifest_path) as f:
+            content = f.read()
         data = ast.literal_eval(content)
     except (OSError, ValueError, SyntaxError):
         return None
     version = data.get("version") if isinstance(data, dict) else None
     if not version or not isinstance(version, str):
         return None
-    # Only accept full Odoo format: major.minor.patch.patch.patch (e.g. "18.0.1.0.0")
-    match = re.match(r"(\d+\.\d+)\.\d+\.\d+\.\d+$", version)
+    match = _MANIFEST_VERSION_RE.match(version)
     return match.group(1) if match else None
 
 
@@ -70,11 +133,8 @@ def get_odoo_version_from_addons(addons_path: str) -> str | None:
     """
     versions: list[str] = []
     for path_str in addons_path.split(","):
-        path = Path(path_str)
-        if not path.is_dir():
-            continue
-        for manifest in path.glob("*/__manifest__.py"):
-            v = _extract_version_from_manifest(manifest)
+        for module_dir in iter_module_dirs(path_str, max_depth=1):
+            v = _extract_version_from_manifest(os.path.join(module_dir, "__manifest__.py"))
             if v:
                 versions.append(v)
     if not versions:
@@ -91,13 +151,10 @@ def check_version_consistency(addons_path: str) -> dict[str, list[str]]:
     """
     version_addons: dict[str, list[str]] = {}
     for path_str in addons_path.split(","):
-        path = Path(path_str)
-        if not path.is_dir():
-            continue
-        for manifest in path.glob("*/__manifest__.py"):
-            v = _extract_version_from_manifest(manifest)
+        for module_dir in iter_module_dirs(path_str, max_depth=1):
+            v = _extract_version_from_manifest(os.path.join(module_dir, "__manifest__.py"))
             if v:
-                version_addons.setdefault(v, []).append(manifest.parent.name)
+                version_addons.setdefault(v, []).append(os.path.basename(module_dir))
     return version_addons
 
 
@@ -121,69 +178,90 @@ def get_odoo_version(
     if detected_paths and detected_paths.get("odoo_dir"):
         for odoo_path in detected_paths["odoo_dir"]:
             # odoo_dir entries point to e.g. <root>/odoo/addons — walk up to find release.py
-            candidate = odoo_path
-            while candidate != candidate.parent:
+            candidate = os.fspath(odoo_path)
+            while candidate != os.path.dirname(candidate):
                 version = get_odoo_version_from_release(candidate)
                 if version:
                     return version
-                candidate = candidate.parent
+                candidate = os.path.dirname(candidate)
 
     # Fallback: infer from addon manifests
     return get_odoo_version_from_addons(addons_path)
 
 
+_WORKERS_ENV = "ODOO_ADDONS_PATH_WORKERS"
+
+
+def _probe_workers() -> int:
+    """Number of threads used to scan addons paths, from ``ODOO_ADDONS_PATH_WORKERS`` (default: 1, no pool)."""
+    try:
+        return max(1, int(os.environ.get(_WORKERS_ENV, "1")))
+    except ValueError:
+        return 1
+
+
+def _probe_module_dirs(path: str | Path) -> list[str]:
+    if not os.path.isdir(path):
+        return []
+    if os.path.isfile(os.path.join(path, "__manifest__.py")):
+        return [os.fspath(path)]
+    # plain strings from os.scandir sort with C-level comparisons
+    return sorted(iter_module_dirs(path))
+
+
 def _process_paths(
-    all_paths: dict[str, list[str]],
+    all_paths: dict[str, dict[str, None]],
     detected_paths: dict,
     addons_dir: list[Path] | None,
     odoo_dir: Path | None,
 ):
+    odoo_candidates = []
     if odoo_dir:
-        _add_to_path(
-            all_paths["odoo_dir"],
-            [odoo_dir / "addons", odoo_dir / "odoo" / "addons"],
-        )
-    if detected_paths.get("odoo_dir"):
-        _add_to_path(all_paths["odoo_dir"], detected_paths["odoo_dir"])
-
-    all_addon_paths_to_process = (
-        (addons_dir or []) + detected_paths.get("addons_dirs", []) + detected_paths.get("addons_dir", [])
-    )
-
-    result = []
-
-    for p in all_addon_paths_to_process:
-        if not p.is_dir():
-            continue
-        manifests = p.glob("**/__manifest__.py")
-        for manifest in sorted(manifests):
-            repo_path = manifest.parent.parent
-            if repo_path not in result:
-                result.append(repo_path)
+        odoo_candidates = [os.path.join(odoo_dir, "addons"), os.path.join(odoo_dir, "odoo", "addons")]
+    _add_to_path(all_paths["odoo_dir"], [*odoo_candidates, *detected_paths.get("odoo_dir", [])])
+
+    all_addon_paths_to_process = [
+        *(addons_dir or ()),
+        *detected_paths.get("addons_dirs", []),
+        *detected_paths.get("addons_dir", []),
+    ]
+
+    workers = _probe_workers()
+    if workers > 1 and len(all_addon_paths_to_process) > 1:
+        # imported here: the pool is opt-in and the import costs every CLI run a few ms
+        from concurrent.futures import ThreadPoolExecutor
+
+        # subtrees are independent: on network filesystems, overlap their latency
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            probed = list(executor.map(_probe_module_dirs, all_addon_paths_to_process))
+    else:
+        probed = [_probe_module_dirs(p) for p in all_addon_paths_to_process]
+    module_dirs = [module_dir for dirs in probed for module_dir in dirs]
 
     _add_to_path(
         all_paths["addon_repositories"],
-        result,
+        list(dict.fromkeys(os.path.dirname(module_dir) for module_dir in module_dirs)),
         is_sorted=not bool(addons_dir),
     )
 
 
-def get_addons_path(
+def _get_addons_path_impl(
     codebase: Path,
     addons_dir: list[Path] | None = None,
     odoo_dir: Path | None = None,
     verbose: bool = False,
     detected_paths: dict | None = None,
+    cache: bool = False,
 ) -> str:
-    all_paths: dict[str, list[str]] = {
-        "odoo_dir": [],
-        "addon_repositories": [],
+    all_paths: dict[str, dict[str, None]] = {
+        "odoo_dir": {},
+        "addon_repositories": {},
     }
 
     # Always detect layout so project addons are discovered even when
     # odoo_dir or addons_dir are given explicitly.
     if detected_paths is None:
-        detected_paths = detect_codebase_layout(codebase, verbose)
+        detected_paths = detect_codebase_layout(codebase, verbose, cache=cache)
 
     _process_paths(all_paths, detected_paths or {}, addons_dir, odoo_dir)
 
@@ -191,15 +269,67 @@ def get_addons_path(
     addons_path = ",".join(result)
 
     if verbose:
+        # build the report up front and write it in one go
+        lines = []
         version = get_odoo_version(addons_path, odoo_dir=odoo_dir, detected_paths=detected_paths)
         if version:
-            typer.echo(f"Odoo version: {version}")
+            lines.append(f"Odoo version: {version}")
         for category, paths in all_paths.items():
             if paths:
-                typer.echo(f"\n# {category}")
-                for path in paths:
-                    typer.echo(path)
-        typer.echo("\n# addons_path")
-        typer.echo(addons_path)
+                lines.extend(("", f"# {category}", *paths))
+        lines.extend(("", "# addons_path", addons_path))
+        typer.echo("\n".join(lines))
 
     return addons_path
+
+
+@functools.lru_cache(maxsize=64)
+def _get_addons_path_cached(
+    codebase: str,
+    addons_dir: tuple[str, ...],
+    odoo_dir: str | None,
+    sig: tuple[int, ...],
+) -> str:
+    return _get_addons_path_impl(
+        Path(codebase),
+        addons_dir=[Path(p) for p in addons_dir],
+        odoo_dir=Path(odoo_dir) if odoo_dir else None,
+        cache=True,
+    )
+
+
+def get_addons_path(
+    codebase: Path,
+    addons_dir: list[Path] | None = None,
+    odoo_dir: Path | None = None,
+    verbose: bool = False,
+    detected_paths: dict | None = None,
+    cache: bool = False,
+) -> str:
+    """Return the comma-separated ``addons_path`` for *codebase*.
+
+    With *cache*, results are kept per arguments and invalidated when the
+    codebase root, a layout marker, one of the folders listed by the layout
+    (e.g. ``addons/``) or an explicit addons dir changes. Changes deeper in
+    the tree, such as a module removed from a repository, are not noticed:
+    call ``clear_cache()`` after them. Verbose calls and calls with
+    pre-computed *detected_paths* always run uncached.
+    """
+    if not cache or verbose or detected_paths is not None:
+        return _get_addons_path_impl(codebase, addons_dir, odoo_dir, verbose, detected_paths)
+    # relative explicit dirs depend on the working directory: key on their real paths
+    addons_dirs = tuple(os.path.realpath(p) for p in addons_dir or ())
+    return _get_addons_path_cached(
+        str(codebase.resolve()),
+        addons_dirs,
+        os.path.realpath(odoo_dir) if odoo_dir else None,
+        layout_signature(codebase, *addons_dirs),
+    )
+
+
+def clear_cache() -> None:
+    """Drop the cached layout detections, ``addons_path`` results and parsed layout files."""
+    _clear_detector_cache()
+    _LAYOUT_CACHE.clear()
+    _get_addons_path_cached.cache_clear()
+    _parse_release.cache_clear()
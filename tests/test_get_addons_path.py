@@ -1,11 +1,17 @@
+import os
 import shutil
+from collections.abc import Sequence
 from pathlib import Path
 
 import pytest
+import typer
 
+from odoo_addons_path.cli import _parse_paths
+from odoo_addons_path.detector import _load_yaml_cached
 from odoo_addons_path.main import (
     _extract_version_from_manifest,
     check_version_consistency,
+    clear_cache,
     detect_codebase_layout,
     get_addons_path,
     get_odoo_version,
@@ -13,85 +19,306 @@ from odoo_addons_path.main import (
     get_odoo_version_from_release,
 )
 
+_DATA_ROOT = Path(__file__).parent / "data"
+_LAYOUT_SRC = {
+    name: _DATA_ROOT / name for name in ("trobz", "c2c", "c2c-new", "doodba", "odoo-sh", "repo-version-module")
+}
 
-@pytest.fixture
-def base_dir(tmp_path: Path) -> Path:
-    d = tmp_path / "project"
-    d.mkdir()
-    return d
+
+def _clone_tree(src: Path, dest: Path) -> None:
+    # hard-link the fixture files: tests only need the tree to exist
+    try:
+        shutil.copytree(src, dest, dirs_exist_ok=True, copy_function=os.link)
+    except OSError:
+        # e.g. tmp_path on another filesystem
+        shutil.rmtree(dest, ignore_errors=True)
+        shutil.copytree(src, dest)
+
+
+def _copy_layout(layout: str, dest: Path) -> None:
+    _clone_tree(_LAYOUT_SRC[layout], dest)
+
+
+def _abs(base: Path, rels: Sequence[str]) -> list[str]:
+    # resolve the base once rather than once per expected path
+    b = str(base.resolve())
+    return [os.path.normpath(os.path.join(b, r)) for r in rels]
+
+
+def _write_release(odoo_dir: Path, content: str) -> Path:
+    release_py = odoo_dir / "odoo" / "release.py"
+    release_py.parent.mkdir(parents=True, exist_ok=True)
+    release_py.write_text(content)
+    return release_py
 
 
-@pytest.mark.parametrize(
-    "layout, expected_paths",
-    [
+_LAYOUT_CASES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    (
+        "trobz",
         (
-            "trobz",
-            [
-                "odoo/addons",
-                "odoo/odoo/addons",
-                "addons/custom-repo",
-                "project",
-            ],
+            "odoo/addons",
+            "odoo/odoo/addons",
+            "addons/custom-repo",
+            "project",
         ),
+    ),
+    (
+        "c2c",
         (
-            "c2c",
-            [
-                "odoo/src/addons",
-                "odoo/src/odoo/addons",
-                "odoo/external-src/custom-repo",
-                "odoo/local-src",
-            ],
+            "odoo/src/addons",
+            "odoo/src/odoo/addons",
+            "odoo/external-src/custom-repo",
+            "odoo/local-src",
         ),
+    ),
+    (
+        "c2c-new",
         (
-            "c2c-new",
-            [
-                "odoo/addons",
-                "odoo/external-src/custom-repo",
-                "odoo/dev-src",
-                "odoo/paid-modules",
-            ],
+            "odoo/addons",
+            "odoo/external-src/custom-repo",
+            "odoo/dev-src",
+            "odoo/paid-modules",
         ),
+    ),
+    (
+        "doodba",
         (
-            "doodba",
-            [
-                "odoo/custom/src/odoo/addons",
-                "odoo/custom/src/odoo/odoo/addons",
-                "odoo/custom/src/custom-repo",
-                "odoo/custom/src/private",
-            ],
+            "odoo/custom/src/odoo/addons",
+            "odoo/custom/src/odoo/odoo/addons",
+            "odoo/custom/src/custom-repo",
+            "odoo/custom/src/private",
         ),
+    ),
+    (
+        "odoo-sh",
         (
-            "odoo-sh",
-            [
-                "odoo/addons",
-                "odoo/odoo/addons",
-                "enterprise",
-                "user/local-src",
-                "themes",
-            ],
+            "odoo/addons",
+            "odoo/odoo/addons",
+            "enterprise",
+            "user/local-src",
+            "themes",
         ),
-    ],
+    ),
 )
-def test_layouts(base_dir: Path, layout: str, expected_paths: list[str]):
-    shutil.copytree(Path(__file__).parent / "data" / layout, base_dir, dirs_exist_ok=True)
-    expected_paths = [str((base_dir / path).resolve()) for path in expected_paths]
-    expected_addons_path = ",".join(expected_paths)
+
+
+@pytest.fixture
+def base_dir(tmp_path: Path) -> Path:
+    d = tmp_path / "project"
+    d.mkdir()
+    return d
+
+
+@pytest.fixture(scope="session")
+def prepared_layouts(tmp_path_factory: pytest.TempPathFactory) -> dict[str, Path]:
+    """Layout trees copied once per session; tests must not modify them."""
+    root = tmp_path_factory.mktemp("layouts")
+    layouts = {}
+    for name in _LAYOUT_SRC:
+        layouts[name] = root / name
+        layouts[name].mkdir()
+        _copy_layout(name, layouts[name])
+    return layouts
+
+
+@pytest.mark.parametrize("layout, expected_paths", _LAYOUT_CASES)
+def test_layouts(prepared_layouts: dict[str, Path], layout: str, expected_paths: tuple[str, ...]):
+    base_dir = prepared_layouts[layout]
+    expected_addons_path = ",".join(_abs(base_dir, expected_paths))
 
     result = get_addons_path(base_dir)
 
     assert result == expected_addons_path
 
 
-@pytest.mark.parametrize("layout", ["trobz", "c2c", "doodba", "odoo-sh"])
-def test_detect_codebase_layout(base_dir: Path, layout: str):
-    shutil.copytree(Path(__file__).parent / "data" / layout, base_dir, dirs_exist_ok=True)
+def test_get_addons_path_with_addons_dir(prepared_layouts: dict[str, Path]):
+    base_dir = prepared_layouts["repo-version-module"]
 
-    result = detect_codebase_layout(base_dir)
+    # explicit paths come first: a folder of repositories, then a single module
+    result = get_addons_path(base_dir, addons_dir=[base_dir / "web", base_dir / "server-env/17.0/addon1"])
+
+    assert result.split(",")[:3] == _abs(base_dir, ["web/17.0", "web/18.0", "server-env/17.0"])
+
+
+def test_get_addons_path_with_nested_addons_dir(prepared_layouts: dict[str, Path]):
+    base_dir = prepared_layouts["c2c"]
+
+    # repositories sit up to three levels below the explicit folder
+    result = get_addons_path(base_dir, addons_dir=[base_dir / "odoo"])
+
+    assert result.split(",")[2:] == _abs(
+        base_dir,
+        ["odoo/external-src/custom-repo", "odoo/local-src", "odoo/src/addons", "odoo/src/odoo/addons"],
+    )
+
+
+def test_get_addons_path_with_odoo_dir(prepared_layouts: dict[str, Path], tmp_path: Path):
+    base_dir = prepared_layouts["repo-version-module"]
+    odoo_src = tmp_path / "odoo-src"
+    _clone_tree(_LAYOUT_SRC["trobz"] / "odoo", odoo_src)
+
+    result = get_addons_path(base_dir, odoo_dir=odoo_src)
+
+    assert result.split(",")[:2] == _abs(odoo_src, ["addons", "odoo/addons"])
+
+
+def test_get_addons_path_with_symlinked_odoo_dir(base_dir: Path, tmp_path: Path):
+    _copy_layout("trobz", base_dir)
+    shared = tmp_path / "shared"
+    (base_dir / "odoo").rename(shared)
+    (base_dir / "odoo").symlink_to(shared)
+
+    result = get_addons_path(base_dir, odoo_dir=shared)
+
+    assert result.split(",") == [
+        *_abs(shared, ["addons", "odoo/addons"]),
+        *_abs(base_dir, ["addons/custom-repo", "project"]),
+    ]
+
+
+def test_get_addons_path_with_probe_workers(prepared_layouts: dict[str, Path], monkeypatch: pytest.MonkeyPatch):
+    base_dir = prepared_layouts["odoo-sh"]
+    detected = detect_codebase_layout(base_dir)
+    serial = get_addons_path(base_dir, detected_paths=detected)
+
+    monkeypatch.setenv("ODOO_ADDONS_PATH_WORKERS", "4")
+
+    assert get_addons_path(base_dir, detected_paths=detected) == serial
+
+
+def test_get_addons_path_sees_new_repository(base_dir: Path):
+    _copy_layout("trobz", base_dir)
+    first = get_addons_path(base_dir, cache=True)
+    assert get_addons_path(base_dir, cache=True) == first
+
+    # no layout marker is touched: the addons/ listing changes
+    addon = base_dir / "addons" / "other-repo" / "addon5"
+    addon.mkdir(parents=True)
+    (addon / "__manifest__.py").write_text("{}")
+    new_repo = _abs(base_dir, ["addons/other-repo"])[0]
+
+    assert new_repo in get_addons_path(base_dir).split(",")
+    assert new_repo in get_addons_path(base_dir, cache=True).split(",")
+
+    shutil.rmtree(base_dir / "addons" / "custom-repo")
+
+    assert _abs(base_dir, ["addons/custom-repo"])[0] not in get_addons_path(base_dir, cache=True).split(",")
+
+
+def test_get_addons_path_cache_keys_on_real_addons_dir(
+    prepared_layouts: dict[str, Path], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    base_dir = prepared_layouts["trobz"]
+    for workdir in ("w1", "w2"):
+        addon = tmp_path / workdir / "custom" / "addon1"
+        addon.mkdir(parents=True)
+        (addon / "__manifest__.py").write_text("{}")
+
+    results = []
+    for workdir in ("w1", "w2"):
+        monkeypatch.chdir(tmp_path / workdir)
+        results.append(get_addons_path(base_dir, addons_dir=[Path("custom")], cache=True).split(","))
+
+    assert _abs(tmp_path, ["w1/custom"])[0] in results[0]
+    assert _abs(tmp_path, ["w2/custom"])[0] in results[1]
+
+
+@pytest.mark.parametrize("layout", ["trobz", "c2c", "doodba", "odoo-sh"])
+def test_detect_codebase_layout(prepared_layouts: dict[str, Path], layout: str):
+    result = detect_codebase_layout(prepared_layouts[layout])
 
     assert isinstance(result, dict)
     assert "odoo_dir" in result or "addons_dirs" in result or "addons_dir" in result
 
 
+def test_detect_fallback_layout_skips_nested_symlinks(base_dir: Path, tmp_path: Path):
+    addon = base_dir / "custom" / "src" / "repo" / "addon1"
+    addon.mkdir(parents=True)
+    (addon / "__manifest__.py").write_text("{}")
+    # a module symlink farm and a link to a folder outside the codebase
+    (base_dir / "auto" / "addons").mkdir(parents=True)
+    (base_dir / "auto" / "addons" / "addon1").symlink_to(addon)
+    outside = tmp_path / "outside" / "repo" / "addon2"
+    outside.mkdir(parents=True)
+    (outside / "__manifest__.py").write_text("{}")
+    (base_dir / "data").symlink_to(tmp_path / "outside")
+
+    result = detect_codebase_layout(base_dir)
+
+    assert result["addons_dirs"] == [base_dir.resolve() / "custom/src/repo"]
+
+
+def test_detect_codebase_layout_sees_new_repository(base_dir: Path):
+    _copy_layout("trobz", base_dir)
+    new_repo = base_dir.resolve() / "addons/other-repo"
+    assert new_repo not in detect_codebase_layout(base_dir, cache=True)["addons_dirs"]
+
+    (base_dir / "addons" / "other-repo").mkdir()
+
+    assert new_repo in detect_codebase_layout(base_dir, cache=True)["addons_dirs"]
+
+
+def test_detect_codebase_layout_retries_after_failure(base_dir: Path):
+    (base_dir / "repo").mkdir()
+    with pytest.raises(typer.Exit):
+        detect_codebase_layout(base_dir, cache=True)
+
+    # the codebase root itself is left untouched
+    addon = base_dir / "repo" / "addon1"
+    addon.mkdir()
+    (addon / "__manifest__.py").write_text("{}")
+
+    assert detect_codebase_layout(base_dir, cache=True)["addons_dirs"] == [base_dir.resolve() / "repo"]
+
+
+def test_clear_cache_drops_parsed_layout_files(base_dir: Path):
+    _copy_layout("doodba", base_dir)
+    assert "odoo_dir" in detect_codebase_layout(base_dir, cache=True)
+
+    # same size and mtime: only clear_cache() can tell the answers changed
+    answers = base_dir / ".copier-answers.yml"
+    st = answers.stat()
+    content = answers.read_text()
+    answers.unlink()  # hard-linked to the fixture
+    answers.write_text(content.replace("doodba", "xxxxxx"))
+    os.utime(answers, ns=(st.st_atime_ns, st.st_mtime_ns))
+    clear_cache()
+
+    assert "odoo_dir" not in detect_codebase_layout(base_dir, cache=True)
+
+
+def test_detect_fallback_layout(base_dir: Path):
+    _copy_layout("repo-version-module", base_dir)
+    # modules under hidden folders or nested inside another module are ignored
+    for noise in (".git/addon5", "server-env/17.0/addon1/tests/addon6"):
+        (base_dir / noise).mkdir(parents=True)
+        (base_dir / noise / "__manifest__.py").write_text("{}")
+
+    result = detect_codebase_layout(base_dir)
+
+    assert sorted(map(str, result["addons_dirs"])) == _abs(
+        base_dir, ["server-env/17.0", "server-env/18.0", "web/17.0", "web/18.0"]
+    )
+
+
+def test_load_yaml_cached_invalidates_on_change(tmp_path: Path):
+    answers_file = tmp_path / ".copier-answers.yml"
+    answers_file.write_text("_src_path: gh:Tecnativa/doodba-copier-template\n")
+    assert _load_yaml_cached(answers_file) == {"_src_path": "gh:Tecnativa/doodba-copier-template"}
+
+    answers_file.write_text("_src_path: gh:example/other-template\n")
+    assert _load_yaml_cached(answers_file) == {"_src_path": "gh:example/other-template"}
+
+
+def test_parse_paths_expands_globs(tmp_path: Path):
+    for name in ("repo-b", "repo-a"):
+        (tmp_path / name).mkdir()
+
+    result = _parse_paths([f"{tmp_path}/repo-*, {tmp_path}/custom", ""])
+
+    assert result == [tmp_path / "repo-a", tmp_path / "repo-b", tmp_path / "custom"]
+
+
 def test_get_odoo_version_from_release(tmp_path: Path):
     release_dir = tmp_path / "odoo"
     release_dir.mkdir()
@@ -103,6 +330,22 @@ def test_get_odoo_version_from_release(tmp_path: Path):
     assert result == "18.0"
 
 
+def test_get_odoo_version_from_release_reparses_on_change(tmp_path: Path):
+    release_py = _write_release(tmp_path, "version_info = (17, 0, 0, 'final', 0)\n")
+    assert get_odoo_version_from_release(tmp_path) == "17.0"
+
+    release_py.write_text("version_info = (18, 0, 0, 'final', 0, '')\n")
+    assert get_odoo_version_from_release(tmp_path) == "18.0"
+
+
+def test_get_odoo_version_from_release_saas(tmp_path: Path):
+    _write_release(tmp_path, "version_info = ('saas~17', 1, 0, FINAL, 0, '')\n")
+
+    result = get_odoo_version_from_release(tmp_path)
+
+    assert result == "saas~17.1"
+
+
 def test_get_odoo_version_from_release_missing(tmp_path: Path):
     result = get_odoo_version_from_release(tmp_path)
 
@@ -119,8 +362,8 @@ def test_get_odoo_version_from_release_no_version_info(tmp_path: Path):
     assert result is None
 
 
-def test_get_addons_path_with_detected_paths(base_dir: Path):
-    shutil.copytree(Path(__file__).parent / "data" / "trobz", base_dir, dirs_exist_ok=True)
+def test_get_addons_path_with_detected_paths(prepared_layouts: dict[str, Path]):
+    base_dir = prepared_layouts["trobz"]
 
     detected = detect_codebase_layout(base_dir)
     result_auto = get_addons_path(base_dir)